@@ -1,9 +1,15 @@
 # app.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import asyncio
-import time
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from dateutil.tz import tzlocal
+from itertools import chain
 import plotly.graph_objs as go
 from edge_core import ProductionConfig
 from edge_core import DataManager, ProductionVitalsPredictor, DigitalTwinManager, AlertManager
@@ -11,6 +17,13 @@ from edge_core import SimulatedECGSensor, SimulatedPulseOximeter, SimulatedBlood
 from utils.auth import login
 from utils.pdf_report import generate_pdf
 from utils.cloud_sync import simulate_sync
+from utils.monitor_constants import (
+    SENSORS, SENSOR_COLORS, RANGES, LEGEND_HTML, LIVE_WINDOW,
+    SAFE_LOWS, SAFE_HIGHS, BORDER_LOWS, BORDER_HIGHS
+)
+
+# Avoid implicit DataFrame copies on column assignment
+pd.options.mode.copy_on_write = True
 
 # --------------------------
 # PAGE CONFIG
@@ -27,11 +40,18 @@ if not login():
 # --------------------------
 # CORE MANAGERS
 # --------------------------
-config = ProductionConfig()
-data_manager = DataManager(config)
-predictor = ProductionVitalsPredictor(config)
-twin_manager = DigitalTwinManager(predictor, data_manager)
-alert_manager = AlertManager(config, data_manager)
+@st.cache_resource
+def get_managers():
+    """Build the core managers once per process instead of on every rerun."""
+    cfg = ProductionConfig()
+    dm = DataManager(cfg)
+    pred = ProductionVitalsPredictor(cfg)
+    tm = DigitalTwinManager(pred, dm)
+    am = AlertManager(cfg, dm)
+    return cfg, dm, pred, tm, am
+
+
+config, data_manager, predictor, twin_manager, alert_manager = get_managers()
 
 simulate_sync()  # Simulate cloud sync
 
@@ -41,9 +61,17 @@ simulate_sync()  # Simulate cloud sync
 patient_id = "patient_001"
 device_id = "edge_001"
 
-ecg_sensor = SimulatedECGSensor(patient_id, device_id)
-spo2_sensor = SimulatedPulseOximeter(patient_id, device_id)
-bp_sensor = SimulatedBloodPressureMonitor(patient_id, device_id)
+@st.cache_resource
+def get_sensors(patient_id, device_id):
+    """Build the simulated sensors once per (patient, device) pair."""
+    return (
+        SimulatedECGSensor(patient_id, device_id),
+        SimulatedPulseOximeter(patient_id, device_id),
+        SimulatedBloodPressureMonitor(patient_id, device_id),
+    )
+
+
+ecg_sensor, spo2_sensor, bp_sensor = get_sensors(patient_id, device_id)
 
 # Always define vitals
 vitals = []
@@ -56,176 +84,204 @@ use_ecg = st.sidebar.checkbox("ECG", True)
 use_spo2 = st.sidebar.checkbox("SpO2", True)
 use_bp = st.sidebar.checkbox("BP", True)
 
+# Enabled sensors, resolved once per run from the checkboxes
+active_sensors = tuple(
+    sensor for sensor, on in ((ecg_sensor, use_ecg), (spo2_sensor, use_spo2), (bp_sensor, use_bp)) if on
+)
+
 # --------------------------
 # SIDEBAR - COLOR LEGEND
 # --------------------------
 st.sidebar.markdown("### 🎨 Vitals Color Legend")
 
-legend_html = """
-<div style='display: flex; flex-direction: column; font-size: 14px;'>
-    <div style='margin-bottom: 4px;'>
-        <span style='background-color: red; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
-        ECG
-    </div>
-    <div style='margin-bottom: 4px;'>
-        <span style='background-color: blue; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
-        SpO2
-    </div>
-    <div style='margin-bottom: 4px;'>
-        <span style='background-color: green; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
-        BP_SYS
-    </div>
-    <div style='margin-bottom: 4px;'>
-        <span style='background-color: orange; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
-        BP_DIA
-    </div>
-</div>
-"""
-
-st.sidebar.markdown(legend_html, unsafe_allow_html=True)
+st.sidebar.markdown(LEGEND_HTML, unsafe_allow_html=True)
 
 # --------------------------
 # SIDEBAR - CSV UPLOAD WITH PREDICTION
 # --------------------------
 st.sidebar.subheader("📤 Upload Vitals CSV")
 uploaded = st.sidebar.file_uploader("Upload CSV", type=["csv"])
-if uploaded:
-    df_uploaded = pd.read_csv(uploaded)
-    st.subheader("📄 Uploaded Data")
-    st.dataframe(df_uploaded)
 
+
+def build_feature_frame(df, required_index):
+    """Select/order the model features in one reindex and coerce them to numbers."""
+    features = df.reindex(columns=required_index, fill_value=0)
+    # Only text columns need parsing; numeric ones are already model-ready.
+    # They are parsed as one flattened block rather than one call per column.
+    text_cols = features.columns[features.dtypes == object]
+    if len(text_cols):
+        block = features[text_cols].to_numpy().ravel()
+        features[text_cols] = pd.to_numeric(block, errors="coerce").reshape(len(features), -1)
+    return features.fillna(0).astype(np.float32, copy=False)
+
+
+CSV_CHUNK_ROWS = 10_000
+PREDICT_WORKERS = os.cpu_count() or 4
+
+
+@st.cache_resource
+def get_executor():
+    """Worker pool shared by all sessions for off-thread predictions."""
+    return ThreadPoolExecutor(max_workers=PREDICT_WORKERS)
+
+
+@st.cache_data(show_spinner="🔮 Running predictions...", max_entries=4)
+def load_and_predict_csv(file_bytes: bytes, _required_index: pd.Index):
+    """Parse an uploaded CSV and predict on it; cached on the file contents.
+
+    ``_required_index`` is fixed per predictor, so it is left out of the
+    cache key.
+
+    The file is parsed once and features are built from row slices of that
+    frame. At most ``PREDICT_WORKERS`` chunks are in flight on the worker
+    pool; the oldest result is collected before another chunk is built, so
+    only that many numeric copies are held on top of the parsed upload.
+    """
+    df = pd.read_csv(io.BytesIO(file_bytes))
+    in_flight = deque()
+    results = []
+    for start in range(0, len(df), CSV_CHUNK_ROWS):
+        if len(in_flight) >= PREDICT_WORKERS:
+            results.append(in_flight.popleft().result())
+        features = build_feature_frame(df.iloc[start:start + CSV_CHUNK_ROWS], _required_index)
+        in_flight.append(get_executor().submit(predictor.predict, features))
+    results.extend(f.result() for f in in_flight)
+    return df, np.concatenate(results)
+
+
+if uploaded:
     try:
-        df_for_pred = df_uploaded.copy()
-        cols_to_keep = predictor.required_features
-        df_for_pred = df_for_pred[[col for col in cols_to_keep if col in df_for_pred.columns]]
+        df_uploaded, csv_predictions = load_and_predict_csv(
+            uploaded.getvalue(), predictor.required_index
+        )
+    except Exception as e:
+        df_uploaded, csv_predictions = pd.read_csv(io.BytesIO(uploaded.getvalue())), None
+        st.error(f"❌ Prediction failed: {e}")
 
-        for col in predictor.required_features:
-            if col not in df_for_pred.columns:
-                df_for_pred[col] = 0
+    st.subheader("📄 Uploaded Data")
+    st.dataframe(df_uploaded)
 
-        df_for_pred = df_for_pred.apply(pd.to_numeric, errors="coerce").fillna(0)
-        csv_predictions = predictor.predict(df_for_pred)
-        df_uploaded["Prediction"] = csv_predictions
+    if csv_predictions is not None:
+        df_uploaded = df_uploaded.assign(Prediction=csv_predictions)
 
         st.subheader("🔮 Predictions from Uploaded Data")
         st.dataframe(df_uploaded)
 
+        # Encode straight into a bytes buffer instead of building a str first
+        csv_buf = io.BytesIO()
+        df_uploaded.to_csv(csv_buf, index=False)
         st.download_button(
             "📥 Download Predictions CSV",
-            df_uploaded.to_csv(index=False),
+            csv_buf.getvalue(),
             file_name="predictions.csv",
             mime="text/csv"
         )
-    except Exception as e:
-        st.error(f"❌ Prediction failed: {e}")
 
 # --------------------------
 # SIMULATE VITALS
 # --------------------------
-if st.button("📈 Read Selected Sensors"):
-    loop = asyncio.new_event_loop()
+def get_loop():
+    """Return this session's event loop, creating it on first use.
+
+    Kept per session rather than in ``st.cache_resource`` because every
+    session runs its script on its own thread and a loop cannot be driven
+    from two threads at once.
+    """
+    loop = st.session_state.get("event_loop")
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        st.session_state["event_loop"] = loop
     asyncio.set_event_loop(loop)
+    return loop
+
 
-    if use_ecg:
-        vitals.append(loop.run_until_complete(ecg_sensor.read_data()))
-    if use_spo2:
-        vitals.append(loop.run_until_complete(spo2_sensor.read_data()))
-    if use_bp:
-        bp_readings = loop.run_until_complete(bp_sensor.read_data())
-        vitals.extend(bp_readings if isinstance(bp_readings, list) else [bp_readings])
+def read_selected_sensors(loop):
+    """Read all enabled sensors concurrently and return a flat list of vitals."""
+    results = loop.run_until_complete(asyncio.gather(*(sensor.read_data() for sensor in active_sensors)))
+    # The BP monitor returns a list (systolic + diastolic); the others a single reading
+    return list(chain.from_iterable(r if isinstance(r, list) else (r,) for r in results))
+
+
+if st.button("📈 Read Selected Sensors"):
+    vitals = read_selected_sensors(get_loop())
 
-    for v in vitals:
-        data_manager.store_vital_sign(v)
+    data_manager.store_vital_signs(vitals)
 
     all_history = data_manager.get_patient_vitals_history(patient_id, limit=30)
     prediction = predictor.predict_trend(patient_id, all_history)
     predictions = [prediction] if prediction else []
     twin_manager.update_twin(patient_id, vitals, predictions)
     alert = alert_manager.generate_alert(patient_id, twin_manager.get_twin(patient_id), predictions)
+    st.session_state["report_inputs"] = (vitals, prediction)
 
     st.success("✅ Simulation, Prediction & Alert done.")
 
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def pdf_report_bytes(vitals, prediction):
+    """Render the PDF report once per distinct set of readings and prediction."""
+    return generate_pdf(vitals, prediction).getvalue()
+
+
+if "report_inputs" in st.session_state:
+    st.download_button(
+        "📄 Download PDF Report",
+        pdf_report_bytes(*st.session_state["report_inputs"]),
+        file_name="vitals_report.pdf",
+        mime="application/pdf"
+    )
+
 # --------------------------
 # LIVE MULTI-SENSOR GRAPH + ICU GAUGES
 # --------------------------
-import time
-
 st.subheader("📡 Live Vitals Monitoring")
 auto_refresh = st.checkbox("Enable Auto Mode", value=True)
 refresh_rate = st.slider("Refresh Interval (seconds)", 1, 10, 3)
 
-graph_placeholder = st.empty()
-desc_placeholder = st.empty()
-gauge_placeholder = st.empty()
-
-# Colors
-sensor_colors = {
-    "ECG": "red",
-    "SpO2": "blue",
-    "BP_SYS": "green",
-    "BP_DIA": "orange"
-}
-
-ranges = {
-    "ECG": {"safe": (60, 100), "borderline": (50, 110)},
-    "SpO2": {"safe": (95, 100), "borderline": (90, 94)},
-    "BP_SYS": {"safe": (90, 130), "borderline": (80, 140)},
-    "BP_DIA": {"safe": (60, 90), "borderline": (50, 95)}
-}
 
-if auto_refresh:
-    for _ in range(200):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+def classify_severity(values, safe_low, safe_high, border_low, border_high):
+    """Severity per reading: 0 safe, 1 borderline, 2 critical. NaN counts as safe."""
+    critical = (values < border_low) | (values > border_high)
+    borderline = (values < safe_low) | (values > safe_high)
+    return np.where(critical, 2, np.where(borderline, 1, 0)).astype(np.int8)
 
-        vitals = []
-        if use_ecg:
-            vitals.append(loop.run_until_complete(ecg_sensor.read_data()))
-        if use_spo2:
-            vitals.append(loop.run_until_complete(spo2_sensor.read_data()))
-        if use_bp:
-            bp_readings = loop.run_until_complete(bp_sensor.read_data())
-            vitals.extend(bp_readings if isinstance(bp_readings, list) else [bp_readings])
 
-        for v in vitals:
-            data_manager.store_vital_sign(v)
+@st.cache_data(show_spinner=False, max_entries=32)
+def history_df(pid, sensor, limit, version):
+    """Vitals history as a DataFrame; ``version`` invalidates the cache after writes."""
+    columns = data_manager.get_patient_vitals_columns(pid, sensor, limit=limit)
+    df = pd.DataFrame(columns).astype({"value": "float32", "sensor": "category"}, copy=False)
+    # Readings are stamped in UTC; the chart shows the monitor's local clock
+    df["timestamp"] = df["timestamp"].dt.tz_localize("UTC").dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    return df
 
-        df = pd.DataFrame(data_manager.get_patient_vitals_history(patient_id, limit=50))
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
 
-        fig = go.Figure()
-        alert_messages = []
-        latest_values = {}
-
-        for sensor in ["ECG", "SpO2", "BP_SYS", "BP_DIA"]:
-            sensor_data = df[df["sensor"] == sensor]
-            if not sensor_data.empty:
-                y_values = pd.to_numeric(sensor_data["value"], errors="coerce")
-                latest_values[sensor] = y_values.iloc[-1]
-
-                fig.add_trace(go.Scatter(
-                    x=sensor_data["timestamp"],
-                    y=y_values,
-                    mode="lines+markers",
-                    name=sensor,
-                    line=dict(color=sensor_colors[sensor])
-                ))
-
-                safe_low, safe_high = ranges[sensor]["safe"]
-                border_low, border_high = ranges[sensor]["borderline"]
-
-                fig.add_hrect(y0=safe_low, y1=safe_high, fillcolor="green", opacity=0.1, line_width=0)
-                fig.add_hrect(y0=border_low, y1=safe_low, fillcolor="yellow", opacity=0.1, line_width=0)
-                fig.add_hrect(y0=safe_high, y1=border_high, fillcolor="yellow", opacity=0.1, line_width=0)
-                fig.add_hrect(y0=border_high, y1=max(y_values)+10, fillcolor="red", opacity=0.1, line_width=0)
-                fig.add_hrect(y0=min(y_values)-10, y1=border_low, fillcolor="red", opacity=0.1, line_width=0)
-
-                latest_value = latest_values[sensor]
-                if latest_value < border_low or latest_value > border_high:
-                    alert_messages.append(f"🚨 {sensor}: {latest_value} (Critical)")
-                elif latest_value < safe_low or latest_value > safe_high:
-                    alert_messages.append(f"⚠ {sensor}: {latest_value} (Borderline)")
+def add_range_bands(fig, sensor):
+    """Add the five safe/borderline/critical bands for one sensor (hidden until it has data)."""
+    safe_low, safe_high = RANGES[sensor]["safe"]
+    border_low, border_high = RANGES[sensor]["borderline"]
+
+    fig.add_hrect(y0=safe_low, y1=safe_high, fillcolor="green", opacity=0.1, line_width=0, visible=False)
+    fig.add_hrect(y0=border_low, y1=safe_low, fillcolor="yellow", opacity=0.1, line_width=0, visible=False)
+    fig.add_hrect(y0=safe_high, y1=border_high, fillcolor="yellow", opacity=0.1, line_width=0, visible=False)
+    fig.add_hrect(y0=border_high, y1=border_high + 10, fillcolor="red", opacity=0.1, line_width=0, visible=False)
+    fig.add_hrect(y0=border_low - 10, y1=border_low, fillcolor="red", opacity=0.1, line_width=0, visible=False)
 
+
+def get_live_figure():
+    """Return this session's live chart, creating its traces and layout once."""
+    fig = st.session_state.get("live_fig")
+    if fig is None:
+        fig = go.Figure()
+        for sensor in SENSORS:
+            fig.add_trace(go.Scattergl(
+                x=[],
+                y=[],
+                mode="lines+markers",
+                name=sensor,
+                line=dict(color=SENSOR_COLORS[sensor])
+            ))
+            add_range_bands(fig, sensor)
         fig.update_layout(
             title="📈 ICU Live Multi-Sensor Monitor",
             xaxis_title="Time",
@@ -233,43 +289,114 @@ if auto_refresh:
             xaxis=dict(tickformat="%H:%M:%S"),
             legend=dict(orientation="h", y=-0.2)
         )
+        st.session_state["live_fig"] = fig
+    return fig
 
-        graph_placeholder.plotly_chart(fig, use_container_width=True)
 
-        if alert_messages:
-            desc_placeholder.error("\n".join(alert_messages))
-        else:
-            desc_placeholder.success("✅ All vitals in safe range.")
+def run_tick(loop):
+    """Read the selected sensors, store the readings and return the fresh history."""
+    vitals = read_selected_sensors(loop)
+    data_manager.store_vital_signs(vitals)
+
+    return history_df(patient_id, None, LIVE_WINDOW, data_manager.write_count)
 
-        # --------------------------
-        # ICU Digital Gauges
-        # --------------------------
-        gauge_cols = gauge_placeholder.columns(4)
-        for i, sensor in enumerate(["ECG", "SpO2", "BP_SYS", "BP_DIA"]):
-            if sensor in latest_values:
-                val = latest_values[sensor]
-                color = sensor_colors[sensor]
-                gauge_cols[i].markdown(
-                    f"""
-                    <div style='text-align:center; padding:10px; background-color:black; border-radius:10px;'>
-                        <h4 style='color:white'>{sensor}</h4>
-                        <h2 style='color:{color}'>{val:.1f}</h2>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
 
-        time.sleep(refresh_rate)
+def render_tick(df, placeholders):
+    """Draw the live chart, alert summary and gauges for one history snapshot."""
+    graph_slot, desc_slot, gauge_slot = placeholders
 
+    if df.empty:
+        positions = {}
+    else:
+        # Row positions per sensor from one pass; no per-sensor sub-frames are built
+        positions = df.groupby("sensor", sort=False, observed=True).indices
+        timestamps = df["timestamp"].to_numpy()
+        values = df["value"].to_numpy()
 
+    fig = get_live_figure()
+    alert_messages = []
+    latest_values = {}
+
+    for i, (trace, sensor) in enumerate(zip(fig.data, SENSORS)):
+        bands = fig.layout.shapes[5 * i:5 * i + 5]
+        idx = positions.get(sensor)
+        if idx is None:
+            trace.update(x=[], y=[])
+            for band in bands:
+                band.visible = False
+        else:
+            # Values are stored as numbers, so no per-tick parsing is needed
+            y_values = values[idx]
+            latest_values[sensor] = y_values[-1]
+            trace.update(x=timestamps[idx], y=y_values)
+
+            # Only the outer edges of the critical bands follow the data
+            bands[3].y1 = np.nanmax(y_values) + 10
+            bands[4].y0 = np.nanmin(y_values) - 10
+            for band in bands:
+                band.visible = True
+
+    latest_arr = np.array(
+        [latest_values.get(s, np.nan) for s in SENSORS],
+        dtype=np.float32
+    )
+    severities = classify_severity(latest_arr, SAFE_LOWS, SAFE_HIGHS, BORDER_LOWS, BORDER_HIGHS)
+    for sensor, severity in zip(SENSORS, severities):
+        if severity == 2:
+            alert_messages.append(f"🚨 {sensor}: {latest_values[sensor]:.1f} (Critical)")
+        elif severity == 1:
+            alert_messages.append(f"⚠ {sensor}: {latest_values[sensor]:.1f} (Borderline)")
+
+    graph_slot.plotly_chart(fig, use_container_width=True)
+
+    if alert_messages:
+        desc_slot.error("\n".join(alert_messages))
+    else:
+        desc_slot.success("✅ All vitals in safe range.")
+
+    # --------------------------
+    # ICU Digital Gauges
+    # --------------------------
+    gauge_cols = gauge_slot.columns(4)
+    for i, sensor in enumerate(SENSORS):
+        if sensor in latest_values:
+            val = latest_values[sensor]
+            color = SENSOR_COLORS[sensor]
+            gauge_cols[i].markdown(
+                f"""
+                <div style='text-align:center; padding:10px; background-color:black; border-radius:10px;'>
+                    <h4 style='color:white'>{sensor}</h4>
+                    <h2 style='color:{color}'>{val:.1f}</h2>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+
+@st.fragment(run_every=f"{refresh_rate}s")
+def live_monitor():
+    """Live chart and gauges; reruns on its own cadence without rerunning the page."""
+    graph_placeholder = st.empty()
+    desc_placeholder = st.empty()
+    gauge_placeholder = st.empty()
+    render_tick(run_tick(get_loop()), (graph_placeholder, desc_placeholder, gauge_placeholder))
+
+
+if auto_refresh:
+    live_monitor()
 
 
 # --------------------------
 # SIDEBAR SUMMARY
 # --------------------------
+@st.cache_data(show_spinner=False, max_entries=8)
+def sidebar_summary(twin_version, alert_version):
+    """Twin and alert summaries; the version arguments invalidate the cache on change."""
+    return twin_manager.get_all_twins_summary(), alert_manager.get_alert_statistics()
+
+
 st.sidebar.title("📋 Summary")
-summary = twin_manager.get_all_twins_summary()
-alerts = alert_manager.get_alert_statistics()
+summary, alerts = sidebar_summary(twin_manager.update_count, alert_manager.update_count)
 st.sidebar.metric("Total Patients", summary["total_patients"])
 st.sidebar.metric("Active Alerts", alerts["active_alerts"])
 st.sidebar.metric("High Risk", len(summary["high_risk_patients"]))
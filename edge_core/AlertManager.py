@@ -1,3 +1,8 @@
+import numpy as np
+
+from .alert_kernels import scan_alerts
+
+
 class AlertManager:
     def __init__(self, config, data_manager):
         self.config = config
@@ -11,39 +16,52 @@ class AlertManager:
             "temp": (36.1, 37.5)  # °C
         }
         self.alerts = {}
+        # Bumped whenever stored alerts change so callers can cache statistics
+        self.update_count = 0
+
+        # Thresholds as arrays so a whole batch is range-checked in one go
+        self._sensor_idx = {name: i for i, name in enumerate(self.thresholds)}
+        bounds = np.array(list(self.thresholds.values()), dtype=np.float64)
+        self._low, self._high = bounds[:, 0], bounds[:, 1]
 
     def generate_alert(self, patient_id, twin, predictions):
-        alerts = []
         vitals = twin.get("vitals", [])
 
+        # Collect (label, threshold index, value) for every checkable reading
+        labels, idx, values = [], [], []
         for vital in vitals:
-            # Extract sensor type + value from dict or object
-            sensor_type = getattr(vital, "sensor_type", vital.get("sensor_type", "")).lower()
-            value = getattr(vital, "value", vital.get("value", None))
+            sensor_type = (vital.sensor_type or "").lower()
+            value = vital.value
 
             # Special handling for BP in "120/80" format
             if sensor_type in ["bp", "blood_pressure"] and isinstance(value, str) and "/" in value:
                 try:
                     sys_val, dia_val = map(int, value.split("/"))
-                    if sys_val < self.thresholds["bp_systolic"][0] or sys_val > self.thresholds["bp_systolic"][1]:
-                        alerts.append(f"Systolic BP out of range: {sys_val}")
-                    if dia_val < self.thresholds["bp_diastolic"][0] or dia_val > self.thresholds["bp_diastolic"][1]:
-                        alerts.append(f"Diastolic BP out of range: {dia_val}")
                 except ValueError:
-                    pass
-            else:
+                    continue
+                labels += [("Systolic BP", sys_val), ("Diastolic BP", dia_val)]
+                idx += [self._sensor_idx["bp_systolic"], self._sensor_idx["bp_diastolic"]]
+                values += [sys_val, dia_val]
+            elif sensor_type in self._sensor_idx and value is not None:
                 # Normal vital check
-                if sensor_type in self.thresholds and value is not None:
-                    low, high = self.thresholds[sensor_type]
-                    try:
-                        if float(value) < low or float(value) > high:
-                            alerts.append(f"{sensor_type.capitalize()} out of range: {value}")
-                    except ValueError:
-                        pass
+                try:
+                    values.append(float(value))
+                except ValueError:
+                    continue
+                labels.append((sensor_type.capitalize(), value))
+                idx.append(self._sensor_idx[sensor_type])
+
+        # One vectorized range check; messages are only built for the hits
+        out_of_range = scan_alerts(values, idx, self._low, self._high)
+        alerts = [
+            f"{name} out of range: {value}"
+            for name, value in (labels[i] for i in np.flatnonzero(out_of_range))
+        ]
 
         # Store alerts for this patient
         if alerts:
             self.alerts[patient_id] = alerts
+            self.update_count += 1
             return {
                 "title": "🚨 Alert",
                 "message": "\n".join(alerts)
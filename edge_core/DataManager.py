@@ -1,51 +1,232 @@
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+import atexit
 import os
-from datetime import datetime
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dateutil.tz import tzlocal
+from itertools import islice
+
+# Readings kept in memory per patient; older ones stay on disk only
+HISTORY_MAXLEN = 10_000
+# Buffered rows are appended to disk in one write once this many are pending,
+# or once config.update_interval seconds have passed since the last write
+FLUSH_EVERY = 64
+# Part files are merged into one once a write leaves more than this many
+COMPACT_AFTER = 256
+# Array dtypes for columnar history reads; other columns come back as object.
+# Timestamps are held as int64 ns, which NumPy takes as-is for datetime64[ns]
+COLUMN_DTYPES = {"timestamp": "datetime64[ns]", "value": np.float64}
+# Stored timestamps are UTC; older versions stamped naive times in this zone
+LOCAL_TZ = tzlocal()
+# Sensor label for each wide feature column, in backfill priority order
+SENSOR_BY_FEATURE = {
+    "heart_rate": "ECG",
+    "bp_systolic": "BP_SYS",
+    "bp_diastolic": "BP_DIA",
+    "oxygen_saturation": "SpO2",
+    "temperature": "Temp",
+}
+
+
+def _epoch_ns(timestamp):
+    """int64 UTC nanoseconds for a reading's timestamp; naive datetimes are local time."""
+    if isinstance(timestamp, int):
+        return timestamp
+    ts = pd.Timestamp(timestamp)
+    if ts.tz is None:
+        ts = ts.tz_localize(LOCAL_TZ, ambiguous="NaT", nonexistent="shift_forward")
+    return ts.value
+
 
 class DataManager:
-    """Handles data loading, saving, and vital history."""
+    """Handles data loading, saving, and vital history.
+
+    Vitals are stored as a Parquet dataset: a directory of numbered files.
+    Each flush appends a ``part-N`` file; compaction merges them into a
+    ``base-N`` file that supersedes everything numbered below it. Recent
+    history is served from an in-memory deque per patient that is hydrated
+    once at startup.
+    """
 
     def __init__(self, config):
         self.data_path = config.data_path
-        self.vitals_history = {}
+        # One instance is shared by every session thread; this guards the
+        # history deques, the pending rows and the write future
+        self._lock = threading.Lock()
+        self.vitals_history = defaultdict(lambda: deque(maxlen=HISTORY_MAXLEN))
+        # Same rows again, keyed by (patient_id, sensor) for per-sensor reads
+        self._sensor_history = defaultdict(lambda: deque(maxlen=HISTORY_MAXLEN))
+        # Bumped on every write so callers can cache reads against it
+        self.write_count = 0
         self.feature_columns = ["heart_rate", "bp_systolic", "bp_diastolic", "oxygen_saturation", "temperature"]
+        self.base_columns = ["patient_id", "timestamp", "sensor", "value"] + self.feature_columns
+        # Rows stored in memory but not yet written to a part file
+        self._pending = []
+        self.flush_interval = config.update_interval
+        self._last_flush = time.monotonic()
+        # Part files are written on one background thread, so writes stay in order
+        self._io_exec = ThreadPoolExecutor(max_workers=1)
+        self._write_future = None
+        # Writes whatever is still pending at exit; see _submit_write
+        atexit.register(self.flush, wait=True)
 
-        # Ensure CSV has correct columns
-        if os.path.exists(self.data_path):
-            df = pd.read_csv(self.data_path)
-            if "sensor" not in df.columns:
-                df["sensor"] = None
-            if "value" not in df.columns:
-                df["value"] = None
-            df.to_csv(self.data_path, index=False)
-
-    def load_data(self):
-        """Load CSV safely with required columns."""
-        base_cols = ["patient_id", "timestamp", "sensor", "value"] + self.feature_columns
-        if os.path.exists(self.data_path):
-            try:
-                df = pd.read_csv(self.data_path)
-                for col in base_cols:
-                    if col not in df.columns:
-                        df[col] = None
-                return df
-            except Exception:
-                return pd.DataFrame(columns=base_cols)
-        return pd.DataFrame(columns=base_cols)
-
-    def save_data(self, df):
-        """Save DataFrame to CSV."""
-        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
-        df.to_csv(self.data_path, index=False)
-
-    def store_vital_sign(self, vital):
-        """Store vitals in wide + long format (value column for graphing)."""
-        pid = getattr(vital, "patient_id", vital.get("patient_id"))
-        timestamp = getattr(vital, "timestamp", vital.get("timestamp", datetime.now()))
-        sensor_type = getattr(vital, "sensor_type", vital.get("sensor_type"))
-        value = getattr(vital, "value", vital.get("value"))
+        # One-time import of a CSV left by older versions next to the dataset
+        legacy_csv = os.path.splitext(self.data_path)[0] + ".csv"
+        if not os.path.exists(self.data_path) and os.path.isfile(legacy_csv):
+            self.save_data(self._read_csv(legacy_csv))
+        self._remove_leftovers()
 
         df = self.load_data()
+        # In-memory rows keep timestamps as int64 ns since the epoch
+        df = df.assign(timestamp=df["timestamp"].to_numpy(dtype="datetime64[ns]").view("int64"))
+        for row in df.to_dict("records"):
+            self._remember(row)
+
+    def _files(self):
+        """(number, name) of every data file in the directory, lowest number first."""
+        if not os.path.isdir(self.data_path):
+            return []
+        files = []
+        for name in os.listdir(self.data_path):
+            kind, _, rest = name.partition("-")
+            number = rest[:-len(".parquet")]
+            if kind in ("part", "base") and rest.endswith(".parquet") and number.isdigit():
+                files.append((int(number), name))
+        return sorted(files)
+
+    def _parts(self):
+        """Names of the files that make up the dataset, in write order.
+
+        A base file holds every row written before it, so files numbered
+        below the newest base are leftovers of an interrupted compaction.
+        """
+        files = self._files()
+        start = max((number for number, name in files if name.startswith("base-")), default=0)
+        return [name for number, name in files if number >= start]
+
+    def _remove_leftovers(self):
+        """Delete files superseded by a base and unfinished temp writes."""
+        if not os.path.isdir(self.data_path):
+            return
+        keep = set(self._parts())
+        for name in os.listdir(self.data_path):
+            if name not in keep and (name.endswith(".tmp") or name.endswith(".parquet")):
+                os.remove(os.path.join(self.data_path, name))
+
+    def _typed(self, df):
+        """Give every base column a fixed dtype so all parts share one schema.
+
+        Readings that are not a single number (e.g. a combined "120/80" BP)
+        keep their text in an extra ``value_text`` column; ``value`` is NaN
+        for them.
+        """
+        df = df.reindex(columns=self.base_columns)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        value = pd.to_numeric(df["value"], errors="coerce")
+        df["value_text"] = df["value"].where(value.isna() & df["value"].notna()).astype("string")
+        df["value"] = value.astype("float64")
+        for col in self.feature_columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        # Repetitive labels are stored dictionary-encoded and read back as categoricals
+        return df.astype({"patient_id": "category", "sensor": "category"})
+
+    def _read_csv(self, path):
+        """Read a legacy CSV store, filling in missing long-format columns.
+
+        Its naive local timestamps are converted to UTC like new readings.
+        """
+        df = pd.read_csv(path)
+        for col in self.base_columns:
+            if col not in df.columns:
+                df[col] = None
+        self._backfill_long_format(df)
+        timestamps = pd.to_datetime(df["timestamp"], errors="coerce")
+        if timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize(LOCAL_TZ, ambiguous="NaT", nonexistent="shift_forward")
+        df["timestamp"] = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+        return df
+
+    def load_data(self, columns=None):
+        """Load the dataset with required columns.
+
+        ``columns`` limits the read to those columns.
+        """
+        columns = list(columns or self.base_columns)
+        self.flush(wait=True)
+        parts = self._parts()
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        try:
+            return self._read_parts(parts, columns)
+        except Exception:
+            return pd.DataFrame(columns=columns)
+
+    def _read_parts(self, parts, columns):
+        """Read ``columns`` from the dataset, putting text readings back into ``value``."""
+        read = columns + ["value_text"] if "value" in columns else columns
+        # The newest part has the current schema; older parts lacking a column read it as null
+        schema = pq.read_schema(os.path.join(self.data_path, parts[-1]))
+        paths = [os.path.join(self.data_path, name) for name in parts]
+        df = pd.read_parquet(paths, engine="pyarrow", columns=read, schema=schema)
+        if "value" in columns:
+            text = df.pop("value_text").astype(object)
+            if text.notna().any():
+                df["value"] = df["value"].astype(object).where(text.isna(), text)
+        return df
+
+    @staticmethod
+    def _backfill_long_format(df):
+        """Fill sensor/value for legacy wide-only rows in one vectorized pass."""
+        missing = df["sensor"].isna().to_numpy()
+        if not missing.any():
+            return
+        conds = [df[col].notna().to_numpy() for col in SENSOR_BY_FEATURE]
+        sensors = np.select(conds, list(SENSOR_BY_FEATURE.values()), default=None)
+        columns = [pd.to_numeric(df[col], errors="coerce").to_numpy() for col in SENSOR_BY_FEATURE]
+        values = np.select(conds, columns, default=np.nan)
+        df["sensor"] = np.where(missing, sensors, df["sensor"].to_numpy(dtype=object))
+        df["value"] = df["value"].where(~(missing & df["value"].isna().to_numpy()), values)
+
+    def save_data(self, df, replaces=None):
+        """Replace the dataset with ``df`` written as a single base file.
+
+        ``replaces`` names the files ``df`` was read from (default: the whole
+        current dataset); exactly those are deleted once the base is in
+        place. The base outnumbers them, so readers skip them even if the
+        deletes never happen.
+        """
+        if replaces is None:
+            replaces = self._parts()
+        self._write_part(df, kind="base")
+        for name in replaces:
+            os.remove(os.path.join(self.data_path, name))
+
+    def _write_part(self, df, kind="part"):
+        """Write ``df`` as the next numbered file and return its name.
+
+        Numbers come from a counter rather than the clock, so they always
+        increase. The file is written under a temp name and renamed into
+        place, so a crash never leaves a truncated file in the dataset.
+        """
+        os.makedirs(self.data_path, exist_ok=True)
+        files = self._files()
+        name = f"{kind}-{files[-1][0] + 1 if files else 1:020d}.parquet"
+        path = os.path.join(self.data_path, name)
+        self._typed(df).to_parquet(path + ".tmp", engine="pyarrow", compression="zstd", index=False)
+        os.replace(path + ".tmp", path)
+        return name
+
+    def _build_row(self, vital):
+        """Flatten one VitalReading into a wide + long format row."""
+        pid, timestamp, sensor_type, value = vital.patient_id, vital.timestamp, vital.sensor_type, vital.value
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            pass
 
         mapping = {
             "ECG": "heart_rate",
@@ -56,27 +237,111 @@ class DataManager:
         }
         feature_col = mapping.get(sensor_type)
 
-        # Add or update row
-        new_row = {col: None for col in self.feature_columns}
-        new_row.update({
+        row = {col: None for col in self.feature_columns}
+        row.update({
             "patient_id": pid,
-            "timestamp": timestamp,
+            "timestamp": _epoch_ns(timestamp),
             "sensor": sensor_type,
             "value": value
         })
         if feature_col:
-            new_row[feature_col] = value
+            row[feature_col] = value
+        return row
+
+    def store_vital_sign(self, vital):
+        """Store vitals in wide + long format (value column for graphing)."""
+        self.store_vital_signs([vital])
 
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        self.save_data(df)
+    def store_vital_signs(self, vitals):
+        """Store a batch of vitals in memory; disk writes are batched by flush()."""
+        if not vitals:
+            return
+        rows = [self._build_row(v) for v in vitals]
+        with self._lock:
+            for row in rows:
+                self._remember(row)
+            self._pending.extend(rows)
+            self.write_count += 1
+            due = (len(self._pending) >= FLUSH_EVERY
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def _remember(self, row):
+        """Add a row to the in-memory history indexes."""
+        self.vitals_history[row["patient_id"]].append(row)
+        self._sensor_history[row["patient_id"], row["sensor"]].append(row)
+
+    def flush(self, wait=False):
+        """Write all pending rows to a new part file in a single write.
+
+        The write runs on the I/O thread so callers do not block on disk;
+        ``wait=True`` returns once everything is on disk. Errors from an
+        earlier background write are raised here, after the rows pending
+        now have been handed to the writer.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            previous, self._write_future = self._write_future, None
+            rows, self._pending = self._pending, []
+            current = self._submit_write(rows) if rows else None
+            if not wait:
+                self._write_future = current
+        # Waited on outside the lock, so other sessions keep storing and reading
+        # while a write (or a compaction) is in progress
+        if wait and current is not None:
+            current.result()
+        if previous is not None:
+            previous.result()
+
+    def _submit_write(self, rows):
+        """Queue ``rows`` on the I/O thread, which writes in submission order.
+
+        The pool is already shut down when atexit runs; the rows are then
+        written inline and None is returned.
+        """
+        try:
+            return self._io_exec.submit(self._write_rows, rows)
+        except RuntimeError:
+            self._write_rows(rows)
+            return None
+
+    def _write_rows(self, rows):
+        """Turn buffered row dicts into one frame and write it as a part.
+
+        Runs after every flush, so this is also where the parts get compacted
+        before a long-running process can pile up thousands of them.
+        """
+        self._write_part(pd.DataFrame(rows))
+        parts = self._parts()
+        if len(parts) > COMPACT_AFTER:
+            self.save_data(self._read_parts(parts, self.base_columns), replaces=parts)
 
     def get_patient_vitals_history(self, patient_id, sensor_type=None, limit=30):
-        """Get last N vitals."""
-        df = self.load_data()
-        patient_data = df[df["patient_id"] == patient_id]
+        """Get last N vitals (served from memory, no disk access)."""
         if sensor_type:
-            patient_data = patient_data[patient_data["sensor"] == sensor_type]
-        return patient_data.tail(limit).to_dict("records")
+            history = self._sensor_history.get((patient_id, sensor_type), ())
+        else:
+            history = self.vitals_history.get(patient_id, ())
+        # Copied under the lock; another session may be appending to the deque
+        with self._lock:
+            return list(islice(reversed(history), limit))[::-1]
+
+    def get_patient_vitals_columns(self, patient_id, sensor_type=None, limit=30,
+                                   columns=("timestamp", "sensor", "value")):
+        """Get last N vitals as one NumPy array per requested column."""
+        rows = self.get_patient_vitals_history(patient_id, sensor_type, limit)
+        arrays = {}
+        for col in columns:
+            values = [row[col] for row in rows]
+            dtype = np.dtype(COLUMN_DTYPES.get(col, object))
+            if dtype.kind == "f":
+                # Readings that are not one number (e.g. "120/80" BP) become NaN
+                values = pd.to_numeric(np.array(values, dtype=object), errors="coerce")
+                arrays[col] = values.astype(dtype, copy=False)
+            else:
+                arrays[col] = np.array(values, dtype=dtype)
+        return arrays
 
     def store_prediction(self, prediction):
         pass
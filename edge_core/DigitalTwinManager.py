@@ -5,6 +5,8 @@ class DigitalTwinManager:
         self.predictor = predictor
         self.data_manager = data_manager
         self.twins = {}
+        # Bumped whenever a twin changes so callers can cache summaries against it
+        self.update_count = 0
 
     def update_twin(self, patient_id, vitals, predictions=None):
         """Store vitals and predictions in digital twin."""
@@ -12,6 +14,7 @@ class DigitalTwinManager:
             "vitals": vitals,
             "predictions": predictions or []
         }
+        self.update_count += 1
 
     def get_twin(self, patient_id):
         """Retrieve patient twin."""
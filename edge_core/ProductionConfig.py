@@ -1,15 +1,15 @@
 import os
 
+# Resolved once at import: edge_core's parent folder is the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class ProductionConfig:
     """Handles configuration for model paths and data locations."""
 
-    def __init__(self, model_path=None, data_path="data/vitals.csv", update_interval=10):
+    def __init__(self, model_path=None, data_path="data/vitals.parquet", update_interval=10):
         # Resolve paths relative to project root
-        base_dir = os.path.dirname(os.path.abspath(__file__))  # edge_core folder
-        project_root = os.path.dirname(base_dir)  # Go up to project root
-
-        self.model_path = model_path or os.path.join(project_root, "models", "model.pkl")
-        self.data_path = os.path.join(project_root, data_path)
+        self.model_path = model_path or os.path.join(PROJECT_ROOT, "models", "model.pkl")
+        self.data_path = os.path.join(PROJECT_ROOT, data_path)
         self.update_interval = update_interval
 
     def get_config(self):
@@ -1,6 +1,66 @@
+import functools
 import os
 import pickle
+import numpy as np
 import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from .ProductionConfig import PROJECT_ROOT
+
+# Unpickled models by (absolute path, mtime_ns); a retrained file is reloaded
+_MODEL_CACHE = {}
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_model_path(model_path):
+    """Absolute model path; relative paths are taken from the project root like data_path."""
+    return model_path if os.path.isabs(model_path) else os.path.join(PROJECT_ROOT, model_path)
+
+
+def _load_model(model_path):
+    """Unpickle the model at ``model_path``, reusing an earlier load of the same file."""
+    model_path = _resolve_model_path(model_path)
+    key = (model_path, os.stat(model_path).st_mtime_ns)
+    if key not in _MODEL_CACHE:
+        with open(model_path, "rb") as f:
+            _MODEL_CACHE[key] = pickle.load(f)
+    return _MODEL_CACHE[key]
+
+
+# Model input order, fixed for every predictor instance
+REQUIRED_FEATURES = (
+    "heart_rate",
+    "bp_systolic",
+    "bp_diastolic",
+    "oxygen_saturation",
+    "temperature"
+)
+_REQUIRED_INDEX = pd.Index(REQUIRED_FEATURES)
+
+# Trend inputs used when the history has no usable reading of that kind
+TREND_DEFAULTS = {
+    "heart_rate": 70,
+    "bp_systolic": 120,
+    "bp_diastolic": 80,
+    "oxygen_saturation": 98,
+    "temperature": 36.5
+}
+# History sensor names -> trend input; "bp" readings fill both pressures
+TREND_FIELDS = {
+    "ECG": "heart_rate", "heart_rate": "heart_rate",
+    "BP_SYS": "bp", "BP": "bp", "blood_pressure": "bp",
+    "SpO2": "oxygen_saturation", "oxygen_saturation": "oxygen_saturation",
+    "Temp": "temperature", "temperature": "temperature",
+}
+
+
+def _to_float(value):
+    """float(value), or NaN when it is not a number (like pd.to_numeric coerce)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
 
 class ProductionVitalsPredictor:
     """Predicts patient vitals trends from history."""
@@ -8,91 +68,94 @@ class ProductionVitalsPredictor:
     def __init__(self, config):
         model_path = config.model_path
 
-        # Load model if available
-        if not os.path.exists(model_path):
+        # Load model if available; a missing file surfaces from the stat() in _load_model
+        try:
+            self.model = _load_model(model_path)
+        except FileNotFoundError:
             print(f"⚠️ Model file missing at {model_path}, using dummy model")
             self.model = None
-        else:
-            with open(model_path, "rb") as f:
-                self.model = pickle.load(f)
-
-        # Define the required feature order
-        self.required_features = [
-            "heart_rate",
-            "bp_systolic",
-            "bp_diastolic",
-            "oxygen_saturation",
-            "temperature"
-        ]
+
+        # Required feature order; the index is shared so callers can reindex against it
+        self.required_features = list(REQUIRED_FEATURES)
+        self.required_index = _REQUIRED_INDEX
+
+        # A plain linear model is just X @ coef + intercept; evaluating that
+        # directly skips sklearn's per-call input validation
+        self._linear = None
+        if isinstance(self.model, LinearRegression) and list(
+            getattr(self.model, "feature_names_in_", self.required_features)
+        ) == self.required_features:
+            self._linear = (np.asarray(self.model.coef_, dtype=np.float64).T, self.model.intercept_)
+
+        # Models fitted on a DataFrame get one back in their own column order.
+        # Names that are not a reordering of ours are passed unchanged, so
+        # sklearn reports the mismatch instead of predicting on wrong columns.
+        self._model_columns = None
+        names = getattr(self.model, "feature_names_in_", None)
+        if names is not None:
+            names = list(names)
+            self._model_columns = names if sorted(names) == sorted(self.required_features) else self.required_features
 
     def predict(self, features_df: pd.DataFrame):
         """Make prediction using model or dummy output if model is missing."""
-        # Ensure all required columns are present
-        for col in self.required_features:
-            if col not in features_df.columns:
-                features_df[col] = 0
-
-        # Correct column order
-        features_df = features_df[self.required_features]
+        # Required columns in model order, missing ones as 0; the caller's frame is left as is
+        features_df = features_df.reindex(columns=self.required_index, fill_value=0)
         features_df = features_df.fillna(0)
 
+        return self._predict_array(features_df.to_numpy(dtype=np.float32))
+
+    def _predict_array(self, features):
+        """Predict on a 2-D array already in REQUIRED_FEATURES order with no NaNs."""
         if self.model is None:
             # Dummy prediction to avoid crashing
-            return [0] * len(features_df)
-        return self.model.predict(features_df)
+            return [0] * len(features)
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if self._linear is not None:
+            coef, intercept = self._linear
+            return features @ coef + intercept
+        if self._model_columns is not None:
+            frame = pd.DataFrame(features, columns=self.required_features)
+            return self.model.predict(frame[self._model_columns])
+        # Fitted without feature names: a bare array in REQUIRED_FEATURES order
+        return self.model.predict(features)
 
     def predict_trend(self, patient_id, history):
         """Predict future trend from patient's vitals history."""
         if not history:
             return None
 
-        df = pd.DataFrame(history)
-
         # Start with default values
-        features = {
-            "heart_rate": 70,
-            "bp_systolic": 120,
-            "bp_diastolic": 80,
-            "oxygen_saturation": 98,
-            "temperature": 36.5
-        }
-
-        # Update from recent history if available
-        try:
-            hr = pd.to_numeric(df[df["sensor"].isin(["ECG", "heart_rate"])]["value"], errors="coerce").dropna()
-            if not hr.empty:
-                features["heart_rate"] = hr.iloc[-1]
-        except Exception:
-            pass
-
-        try:
-            bp_values = df[df["sensor"].isin(["BP_SYS", "BP", "blood_pressure"])]["value"].dropna()
-            if not bp_values.empty and "/" in str(bp_values.iloc[-1]):
-                sys_val, dia_val = bp_values.iloc[-1].split("/")
-                features["bp_systolic"] = pd.to_numeric(sys_val, errors="coerce")
-                features["bp_diastolic"] = pd.to_numeric(dia_val, errors="coerce")
-        except Exception:
-            pass
-
-        try:
-            spo2 = pd.to_numeric(df[df["sensor"].isin(["SpO2", "oxygen_saturation"])]["value"], errors="coerce").dropna()
-            if not spo2.empty:
-                features["oxygen_saturation"] = spo2.iloc[-1]
-        except Exception:
-            pass
-
-        try:
-            temp = pd.to_numeric(df[df["sensor"].isin(["Temp", "temperature"])]["value"], errors="coerce").dropna()
-            if not temp.empty:
-                features["temperature"] = temp.iloc[-1]
-        except Exception:
-            pass
-
-        # Convert features to DataFrame
-        feature_df = pd.DataFrame([features])
+        features = dict(TREND_DEFAULTS)
+
+        # Update from the most recent reading of each kind, walking back once
+        pending = set(TREND_FIELDS.values())
+        for rec in reversed(history):
+            field = TREND_FIELDS.get(rec.get("sensor"))
+            if field not in pending:
+                continue
+            value = rec.get("value")
+            if field == "bp":
+                if value is None or value != value:
+                    continue
+                # Only "120/80" style readings carry both pressures
+                parts = str(value).split("/")
+                if len(parts) == 2:
+                    features["bp_systolic"] = _to_float(parts[0])
+                    features["bp_diastolic"] = _to_float(parts[1])
+            else:
+                value = _to_float(value)
+                if value != value:
+                    continue
+                features[field] = value
+            pending.discard(field)
+            if not pending:
+                break
+
+        # One-row array in model feature order; unparsable values count as 0 like in predict()
+        feature_row = np.array([[features[name] for name in REQUIRED_FEATURES]], dtype=np.float32)
 
         # Predict
-        y_pred = self.predict(feature_df)
+        y_pred = self._predict_array(np.nan_to_num(feature_row, nan=0.0))
 
         return {
             "prediction_type": "Vitals Trend",
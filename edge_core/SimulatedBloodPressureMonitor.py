@@ -1,35 +1,44 @@
-import random
 import asyncio
-from datetime import datetime
+import time
+
+import numpy as np
+
+from .VitalReading import VitalReading
 
 class SimulatedBloodPressureMonitor:
     """Simulates Blood Pressure readings (systolic & diastolic)"""
     def __init__(self, patient_id, device_id):
         self.patient_id = patient_id
         self.device_id = device_id
+        self._rng = np.random.default_rng()
 
     async def read_data(self):
-        await asyncio.sleep(0.5)
-        systolic_value = random.randint(110, 140)
-        diastolic_value = random.randint(70, 90)
+        return await self.read_batch(1)
 
-        return [
-            {
-                "patient_id": self.patient_id,
-                "device_id": self.device_id,
-                "sensor_type": "BP_SYS",
-                "value": systolic_value,
-                "unit": "mmHg",
-                "timestamp": datetime.now(),
-                "quality_score": random.uniform(0.9, 1.0)
-            },
-            {
-                "patient_id": self.patient_id,
-                "device_id": self.device_id,
-                "sensor_type": "BP_DIA",
-                "value": diastolic_value,
-                "unit": "mmHg",
-                "timestamp": datetime.now(),
-                "quality_score": random.uniform(0.9, 1.0)
-            }
-        ]
+    async def read_batch(self, n):
+        """Read ``n`` samples at once as systolic, diastolic reading pairs."""
+        await asyncio.sleep(0.5)
+        systolic = self._rng.integers(110, 141, size=n).tolist()
+        diastolic = self._rng.integers(70, 91, size=n).tolist()
+        qualities = self._rng.uniform(0.9, 1.0, size=(n, 2)).tolist()
+        readings = []
+        for sys_value, dia_value, (sys_quality, dia_quality) in zip(systolic, diastolic, qualities):
+            readings.append(VitalReading(
+                patient_id=self.patient_id,
+                device_id=self.device_id,
+                sensor_type="BP_SYS",
+                value=sys_value,
+                unit="mmHg",
+                timestamp=time.time_ns(),
+                quality_score=sys_quality
+            ))
+            readings.append(VitalReading(
+                patient_id=self.patient_id,
+                device_id=self.device_id,
+                sensor_type="BP_DIA",
+                value=dia_value,
+                unit="mmHg",
+                timestamp=time.time_ns(),
+                quality_score=dia_quality
+            ))
+        return readings
@@ -1,6 +1,9 @@
-import random
 import asyncio
-from datetime import datetime
+import time
+
+import numpy as np
+
+from .VitalReading import VitalReading
 
 class SimulatedPulseOximeter:
     """Simulates Pulse Oximeter readings"""
@@ -8,15 +11,25 @@ class SimulatedPulseOximeter:
         self.patient_id = patient_id
         self.device_id = device_id
         self.sensor_type = "SpO2"
+        self._rng = np.random.default_rng()
 
     async def read_data(self):
+        return (await self.read_batch(1))[0]
+
+    async def read_batch(self, n):
+        """Read ``n`` samples at once; each random column is drawn in one NumPy call."""
         await asyncio.sleep(0.5)
-        return {
-            "patient_id": self.patient_id,
-            "device_id": self.device_id,
-            "sensor_type": self.sensor_type,
-            "value": random.uniform(95, 100),
-            "unit": "%",
-            "timestamp": datetime.now(),
-            "quality_score": random.uniform(0.9, 1.0)
-        }
+        values = self._rng.uniform(95, 100, size=n).tolist()
+        qualities = self._rng.uniform(0.9, 1.0, size=n).tolist()
+        return [
+            VitalReading(
+                patient_id=self.patient_id,
+                device_id=self.device_id,
+                sensor_type=self.sensor_type,
+                value=value,
+                unit="%",
+                timestamp=time.time_ns(),
+                quality_score=quality
+            )
+            for value, quality in zip(values, qualities)
+        ]
@@ -0,0 +1,8 @@
+from collections import namedtuple
+
+# One sensor sample; a tuple keeps readings small and their fields fixed.
+# Simulated sensors stamp readings with time.time_ns() (int64 ns since the epoch, UTC).
+VitalReading = namedtuple(
+    "VitalReading",
+    "patient_id device_id sensor_type value unit timestamp quality_score",
+)
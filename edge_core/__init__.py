@@ -1,4 +1,5 @@
 from .ProductionConfig import ProductionConfig
+from .VitalReading import VitalReading
 from .DataManager import DataManager
 from .ProductionVitalsPredictor import ProductionVitalsPredictor
 from .DigitalTwinManager import DigitalTwinManager
@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def scan_alerts(values, sensor_ids, lows, highs):
+    """Return a uint8 mask of readings outside their sensor's [low, high] range.
+
+    ``sensor_ids`` index into ``lows``/``highs``; negative ids (unknown
+    sensors) are never flagged. Works on any batch size, so a patient's whole
+    stored history can be re-scanned in one call.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sensor_ids = np.asarray(sensor_ids, dtype=np.intp)
+    known = sensor_ids >= 0
+    ids = np.where(known, sensor_ids, 0)
+    out_of_range = known & ((values < lows[ids]) | (values > highs[ids]))
+    return out_of_range.astype(np.uint8)
@@ -0,0 +1,55 @@
+# utils/monitor_constants.py
+
+from types import MappingProxyType
+from typing import Final
+
+import numpy as np
+
+# Defined in an imported module (not app.py) so they are built once per
+# process instead of on every Streamlit rerun.
+
+SENSORS: Final = ("ECG", "SpO2", "BP_SYS", "BP_DIA")
+
+# Only the most recent readings are ever sent to the live chart
+LIVE_WINDOW: Final = 50
+
+SENSOR_COLORS: Final = MappingProxyType({
+    "ECG": "red",
+    "SpO2": "blue",
+    "BP_SYS": "green",
+    "BP_DIA": "orange"
+})
+
+RANGES: Final = MappingProxyType({
+    "ECG": {"safe": (60, 100), "borderline": (50, 110)},
+    "SpO2": {"safe": (95, 100), "borderline": (90, 94)},
+    "BP_SYS": {"safe": (90, 130), "borderline": (80, 140)},
+    "BP_DIA": {"safe": (60, 90), "borderline": (50, 95)}
+})
+
+# Per-sensor bounds as arrays (in SENSORS order) for vectorized checks
+SAFE_LOWS, SAFE_HIGHS, BORDER_LOWS, BORDER_HIGHS = np.array(
+    [RANGES[s]["safe"] + RANGES[s]["borderline"] for s in SENSORS],
+    dtype=np.float32
+).T
+
+LEGEND_HTML: Final = """
+<div style='display: flex; flex-direction: column; font-size: 14px;'>
+    <div style='margin-bottom: 4px;'>
+        <span style='background-color: red; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
+        ECG
+    </div>
+    <div style='margin-bottom: 4px;'>
+        <span style='background-color: blue; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
+        SpO2
+    </div>
+    <div style='margin-bottom: 4px;'>
+        <span style='background-color: green; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
+        BP_SYS
+    </div>
+    <div style='margin-bottom: 4px;'>
+        <span style='background-color: orange; width: 12px; height: 12px; display: inline-block; margin-right: 8px;'></span>
+        BP_DIA
+    </div>
+</div>
+"""
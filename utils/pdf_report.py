@@ -1,8 +1,9 @@
 from fpdf import FPDF
 from datetime import datetime
-import os
+import io
 
-def generate_pdf(vitals, prediction):
+def generate_pdf(vitals, prediction, output=None):
+    """Render the report into ``output`` (a new BytesIO by default) and return it."""
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", "B", 16)
@@ -20,10 +21,10 @@ def generate_pdf(vitals, prediction):
     pdf.set_font("Arial", "", 12)
 
     for v in vitals:
-        sensor_type = v.get("sensor_type", "Unknown")
-        value = v.get("value", "N/A")
-        unit = v.get("unit", "")
-        quality = v.get("quality_score", 0)
+        sensor_type = v.sensor_type or "Unknown"
+        value = "N/A" if v.value is None else v.value
+        unit = v.unit or ""
+        quality = v.quality_score or 0
 
         pdf.cell(0, 10,
                  f"{sensor_type}: {value} {unit} | Quality: {quality:.2f}",
@@ -42,14 +43,10 @@ def generate_pdf(vitals, prediction):
         pdf.cell(0, 10,
                  f"Confidence: {prediction.get('confidence', 0):.2f} | Uncertainty: {prediction.get('uncertainty', 0):.2f}",
                  ln=True)
-        risk_factors = prediction.get('risk_factors', [])
-        pdf.cell(0, 10,
-                 f"Risk Factors: {', '.join(risk_factors) if risk_factors else 'None'}",
-                 ln=True)
-
-    # Ensure data folder exists
-    os.makedirs("data", exist_ok=True)
-    file_path = f"data/report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    pdf.output(file_path)
+        risk_factors = ', '.join(prediction.get('risk_factors') or ()) or 'None'
+        pdf.cell(0, 10, f"Risk Factors: {risk_factors}", ln=True)
 
-    return file_path
+    # fpdf 1.x returns the document as a latin-1 str; nothing touches the disk
+    output = output or io.BytesIO()
+    output.write(pdf.output(dest="S").encode("latin-1"))
+    return output